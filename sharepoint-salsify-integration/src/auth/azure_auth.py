@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import threading
 import time
-from typing import Dict, Optional
+from typing import Optional, Tuple
 
 import msal
 
@@ -12,8 +12,16 @@ class AzureAuthenticator:
     Authenticates against Azure AD using OAuth2 Client Credentials via MSAL.
 
     Caches tokens in-memory and refreshes them proactively. Thread-safe.
+
+    A background thread renews the token ahead of expiry, so readers normally return the
+    cached token without taking a lock.
     """
 
+    # Minimum delay between proactive refresh attempts, also used after a failed attempt
+    REFRESH_RETRY_SECONDS = 30.0
+    # How long callers wait for another thread's in-flight acquisition
+    INFLIGHT_WAIT_SECONDS = 30.0
+
     def __init__(
         self,
         tenant_id: str,
@@ -35,20 +43,78 @@ class AzureAuthenticator:
             client_credential=self.client_secret,
             authority=self.authority,
         )
-        self._cached_token: Optional[Dict[str, str]] = None
-        self._token_expiry_epoch: float = 0.0
+        # (access_token, expiry_epoch) replaced as a single reference so lock-free readers
+        # never observe a token paired with another token's expiry
+        self._token_state: Optional[Tuple[str, float]] = None
         self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        # Set while one thread acquires a token; other callers wait on it instead of MSAL
+        self._inflight: Optional[threading.Event] = None
+        self._inflight_error: Optional[Exception] = None
 
     def get_access_token(self) -> str:
         """Return a valid access token, refreshing if needed."""
+        return self.get_token_and_expiry()[0]
+
+    def get_token_and_expiry(self) -> Tuple[str, float]:
+        """Return a valid access token and its expiry as an epoch timestamp."""
+        state = self._token_state
+        if state and time.time() < state[1] - self.token_refresh_margin_seconds:
+            return state
+
+        while True:
+            with self._lock:
+                state = self._token_state
+                if state and time.time() < state[1] - self.token_refresh_margin_seconds:
+                    return state
+                inflight = self._inflight
+                leader = inflight is None
+                if leader:
+                    inflight = self._inflight = threading.Event()
+                    self._inflight_error = None
+
+            if leader:
+                return self._acquire_as_leader(inflight)
+
+            # Another thread is talking to Azure AD; reuse its result
+            if not inflight.wait(timeout=self.INFLIGHT_WAIT_SECONDS):
+                raise RuntimeError("Timed out waiting for Azure AD token acquisition")
+            state = self._token_state
+            if state and time.time() < state[1]:
+                return state
+            error = self._inflight_error
+            if error is not None:
+                raise RuntimeError(f"Failed to acquire token from Azure AD: {error}") from error
+
+    def _acquire_as_leader(self, inflight: threading.Event) -> Tuple[str, float]:
+        # Network I/O happens outside the lock; waiters are released via the event
+        try:
+            state = self._acquire_token()
+        except Exception as ex:
+            with self._lock:
+                self._inflight_error = ex
+                self._inflight = None
+            inflight.set()
+            raise
+
         with self._lock:
-            now = time.time()
-            if (
-                self._cached_token
-                and now < self._token_expiry_epoch - self.token_refresh_margin_seconds
-            ):
-                return self._cached_token["access_token"]
+            self._token_state = state
+            self._inflight = None
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="azure-token-refresh", daemon=True)
+                self._refresher.start()
+        inflight.set()
+        return state
+
+    def close(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop_event.set()
 
+    def _acquire_token(self, use_cache: bool = True) -> Tuple[str, float]:
+        now = time.time()
+        result = None
+        if use_cache:
             # Try acquire from cache (MSAL internal cache)
             accounts = self._app.get_accounts()
             if accounts:
@@ -56,15 +122,28 @@ class AzureAuthenticator:
             else:
                 result = self._app.acquire_token_silent(scopes=self.scopes, account=None)
 
-            if not result:
-                result = self._app.acquire_token_for_client(scopes=self.scopes)
+        if not result:
+            result = self._app.acquire_token_for_client(scopes=self.scopes)
 
-            if "access_token" not in result:
-                error_desc = result.get("error_description") if isinstance(result, dict) else None
-                raise RuntimeError(f"Failed to acquire token from Azure AD: {error_desc}")
+        if "access_token" not in result:
+            error_desc = result.get("error_description") if isinstance(result, dict) else None
+            raise RuntimeError(f"Failed to acquire token from Azure AD: {error_desc}")
 
-            self._cached_token = result
-            expires_in = float(result.get("expires_in", 3000))
-            self._token_expiry_epoch = now + expires_in
-            return result["access_token"]
+        expires_in = float(result.get("expires_in", 3000))
+        return result["access_token"], now + expires_in
 
+    def _refresh_loop(self) -> None:
+        while True:
+            state = self._token_state
+            expiry = state[1] if state else 0.0
+            delay = max(expiry - 2 * self.token_refresh_margin_seconds - time.time(), self.REFRESH_RETRY_SECONDS)
+            if self._stop_event.wait(timeout=delay):
+                return
+            try:
+                new_state = self._acquire_token(use_cache=False)
+            except Exception:
+                # Keep serving the current token until it expires; callers fall back to a
+                # synchronous refresh once it is inside the margin
+                continue
+            with self._lock:
+                self._token_state = new_state
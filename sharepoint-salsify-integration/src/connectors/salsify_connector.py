@@ -1,13 +1,48 @@
 from __future__ import annotations
 
 import io
-from typing import Dict, Optional
+import mimetypes
+import os
+import threading
+from typing import ClassVar, Dict, Optional
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from requests_toolbelt import MultipartEncoder
 
-from ..utils import get_logger
+from ..utils import get_logger, make_session
+
+
+# Read size used when pulling from the source stream; a multiple of the 16KB TLS record size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _SizedReader:
+    """Buffered reader over a stream of known length.
+
+    MultipartEncoder sizes file parts via ``len``/``fileno``; for a socket-backed HTTP
+    response ``fileno`` reports 0 bytes, so the remaining length is tracked explicitly.
+    """
+
+    def __init__(self, raw: io.RawIOBase, size: int) -> None:
+        self._reader = io.BufferedReader(raw, buffer_size=STREAM_CHUNK_SIZE)  # type: ignore[arg-type]
+        self._remaining = size
+
+    @property
+    def len(self) -> int:
+        return self._remaining
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._reader.read(size)
+        if not data and size:
+            # A short source would leave the declared Content-Length unsatisfied
+            raise IOError(f"Source stream ended with {self._remaining} bytes still expected")
+        self._remaining -= len(data)
+        if data and not self._remaining and self._reader.peek(1):
+            # A longer source means the declared size was stale; sending it would truncate the file
+            raise IOError("Source stream is longer than its declared size")
+        return data
 
 
 class SalsifyConnector:
@@ -16,35 +51,73 @@ class SalsifyConnector:
     Note: Salsify API authentication can use API key header or Bearer token depending on org setup.
     """
 
+    # Content types resolved per lowercase extension, shared by all instances
+    _CONTENT_TYPES: ClassVar[Dict[str, str]] = {}
+
     def __init__(
         self,
         base_url: str,
         org_id: str,
         api_key: str,
         auth_scheme: str = "Bearer",
+        session: Optional[requests.Session] = None,
+        max_concurrency: int = 8,
         logger_name: str = "salsify",
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.org_id = org_id
         self.api_key = api_key
         self.auth_scheme = auth_scheme
+        if self.auth_scheme.lower() == "x-api-key":
+            self._auth_headers = {"X-API-KEY": self.api_key}
+        else:
+            self._auth_headers = {"Authorization": f"Bearer {self.api_key}"}
         self.logger = get_logger(logger_name)
-        self.session = requests.Session()
-        retries = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
-        adapter = HTTPAdapter(max_retries=retries, pool_connections=10, pool_maxsize=10)
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
+        self.session = session or make_session()
+        # Caps concurrent uploads to stay within Salsify's per-org concurrency limit
+        self._upload_slots = threading.BoundedSemaphore(max_concurrency)
+
+    def upload_slot(self) -> threading.BoundedSemaphore:
+        """Context manager reserving one of ``max_concurrency`` upload slots.
+
+        Callers hold it around ``upload_asset``, and should take it before opening the source
+        stream so idle downloads do not pile up waiting for a slot.
+        """
+        return self._upload_slots
 
     def _headers(self) -> Dict[str, str]:
-        if self.auth_scheme.lower() == "x-api-key":
-            return {"X-API-KEY": self.api_key}
-        return {"Authorization": f"Bearer {self.api_key}"}
+        # Credentials are static, so the header dict is built once; callers must not mutate it
+        return self._auth_headers
 
-    def upload_asset(self, file_stream: io.BufferedReader, filename: str, content_type: Optional[str] = None) -> Dict:
+    @classmethod
+    def _content_type_for(cls, filename: str) -> str:
+        ext = os.path.splitext(filename)[1].lower()
+        content_type = cls._CONTENT_TYPES.get(ext)
+        if content_type is None:
+            content_type = mimetypes.guess_type(f"file{ext}")[0] or "application/octet-stream"
+            cls._CONTENT_TYPES[ext] = content_type
+        return content_type
+
+    def upload_asset(
+        self,
+        file_stream: io.BufferedReader,
+        filename: str,
+        content_type: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> Dict:
         url = f"{self.base_url}/v1/orgs/{self.org_id}/assets"
-        headers = self._headers()
-        files = {"file": (filename, file_stream, content_type or "application/octet-stream")}
-        resp = self.session.post(url, headers=headers, files=files, timeout=120)
+        if size is not None:
+            body = _SizedReader(file_stream, size)
+        elif hasattr(file_stream, "getvalue"):
+            # Already in memory; MultipartEncoder sizes it directly
+            body = file_stream
+        else:
+            # Buffering a live stream would defeat streaming; the part size must be known
+            raise IOError(f"Cannot stream {filename} to Salsify without a known length")
+        # MultipartEncoder reads the source stream lazily, so memory stays O(chunk) per upload
+        encoder = MultipartEncoder(fields={"file": (filename, body, content_type or self._content_type_for(filename))})
+        headers = {**self._headers(), "Content-Type": encoder.content_type}
+        resp = self.session.post(url, headers=headers, data=encoder, timeout=120)
         resp.raise_for_status()
         return resp.json()
 
@@ -1,67 +1,125 @@
 from __future__ import annotations
 
 import io
-from typing import Dict, Iterable, List, Optional
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 from ..auth import AzureAuthenticator
-from ..utils import get_logger
+from ..utils import get_logger, make_session
 
 
 class SharePointConnector:
     """Connector for SharePoint via Microsoft Graph API."""
 
     GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+    # Drive and folder ids practically never change; re-resolve hourly or on 404
+    IDS_CACHE_TTL_SECONDS = 3600
 
     def __init__(
         self,
         authenticator: AzureAuthenticator,
         site_id: str,
         folder_path: str,
+        delta_state_path: Optional[Path] = None,
+        session: Optional[requests.Session] = None,
+        max_concurrency: int = 16,
         logger_name: str = "sharepoint",
     ) -> None:
         self.authenticator = authenticator
         self.site_id = site_id
         self.folder_path = folder_path.strip("/")
+        self.delta_state_path = delta_state_path
         self.logger = get_logger(logger_name)
-        self.session = requests.Session()
-        retries = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
-        adapter = HTTPAdapter(max_retries=retries, pool_connections=10, pool_maxsize=10)
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
+        self.session = session or make_session()
+        # Caps concurrent downloads to stay within Graph's throttling budget
+        self._download_slots = threading.BoundedSemaphore(max_concurrency)
+        # (headers, valid_until) for the current bearer token
+        self._hdr_cache: Optional[Tuple[Dict[str, str], float]] = None
+        self._ids_cache: Optional[Dict[str, str]] = None
+        self._ids_expiry: float = 0.0
+        self._ids_lock = threading.Lock()
+        self._delta_link: Optional[str] = self._load_delta_link()
+
+    def _load_delta_link(self) -> Optional[str]:
+        if self.delta_state_path is None:
+            return None
+        try:
+            if self.delta_state_path.exists():
+                return self.delta_state_path.read_text(encoding="utf-8").strip() or None
+        except Exception:
+            pass
+        return None
+
+    def save_delta_link(self, delta_link: str) -> None:
+        """Persist ``delta_link`` so a restart resumes from it.
+
+        Callers should only save a link once every item from the listing that returned it
+        has finished; otherwise a restart would never see the unfinished items again.
+        """
+        if self.delta_state_path is None or not delta_link:
+            return
+        try:
+            self.delta_state_path.parent.mkdir(parents=True, exist_ok=True)
+            self.delta_state_path.write_text(delta_link, encoding="utf-8")
+        except Exception:
+            pass
 
     def _headers(self) -> Dict[str, str]:
-        token = self.authenticator.get_access_token()
-        return {"Authorization": f"Bearer {token}"}
+        # The returned dict is shared between threads; callers must not mutate it
+        cached = self._hdr_cache
+        if cached and time.time() < cached[1]:
+            return cached[0]
+        token, expiry = self.authenticator.get_token_and_expiry()
+        headers = {"Authorization": f"Bearer {token}"}
+        self._hdr_cache = (headers, expiry - self.authenticator.token_refresh_margin_seconds)
+        return headers
 
-    def _resolve_drive_and_item(self) -> Dict[str, str]:
-        # Resolve the drive (default document library) and folder item id
-        headers = self._headers()
-        # Get default drive
-        drive_url = f"{self.GRAPH_BASE}/sites/{self.site_id}/drive"
-        resp = self.session.get(drive_url, headers=headers, timeout=30)
-        resp.raise_for_status()
-        drive_id = resp.json()["id"]
+    def _resolve_drive_and_item(self, force_refresh: bool = False) -> Dict[str, str]:
+        with self._ids_lock:
+            if not force_refresh and self._ids_cache and time.monotonic() < self._ids_expiry:
+                return self._ids_cache
+
+            # Resolve the drive (default document library) and folder item id
+            headers = self._headers()
+            # Get default drive
+            drive_url = f"{self.GRAPH_BASE}/sites/{self.site_id}/drive"
+            resp = self.session.get(drive_url, headers=headers, timeout=30)
+            resp.raise_for_status()
+            drive_id = resp.json()["id"]
+
+            # Resolve folder by path
+            path_url = f"{self.GRAPH_BASE}/drives/{drive_id}/root:/{self.folder_path}"
+            resp2 = self.session.get(path_url, headers=headers, timeout=30)
+            resp2.raise_for_status()
+            item_id = resp2.json()["id"]
+
+            self._ids_cache = {"drive_id": drive_id, "item_id": item_id}
+            self._ids_expiry = time.monotonic() + self.IDS_CACHE_TTL_SECONDS
+            return self._ids_cache
 
-        # Resolve folder by path
-        path_url = f"{self.GRAPH_BASE}/drives/{drive_id}/root:/{self.folder_path}"
-        resp2 = self.session.get(path_url, headers=headers, timeout=30)
-        resp2.raise_for_status()
-        item_id = resp2.json()["id"]
-        return {"drive_id": drive_id, "item_id": item_id}
+    @property
+    def drive_id(self) -> str:
+        return self._resolve_drive_and_item()["drive_id"]
+
+    def _list_children(self, ids: Dict[str, str]) -> requests.Response:
+        headers = self._headers()
+        children_url = f"{self.GRAPH_BASE}/drives/{ids['drive_id']}/items/{ids['item_id']}/children?$select=id,name,file,createdDateTime,lastModifiedDateTime,size"
+        return self.session.get(children_url, headers=headers, timeout=30)
 
     def list_new_files(self, allowed_extensions: Optional[Iterable[str]] = None) -> List[Dict]:
         if allowed_extensions is None:
             allowed_extensions = {".tif", ".tiff", ".jpg", ".jpeg", ".png"}
+        exts = tuple(ext.lower() for ext in allowed_extensions)
 
-        ids = self._resolve_drive_and_item()
-        headers = self._headers()
         # List children of folder
-        children_url = f"{self.GRAPH_BASE}/drives/{ids['drive_id']}/items/{ids['item_id']}/children?$select=id,name,file,createdDateTime,lastModifiedDateTime,size"
-        resp = self.session.get(children_url, headers=headers, timeout=30)
+        resp = self._list_children(self._resolve_drive_and_item())
+        if resp.status_code == 404:
+            # Drive or folder moved since it was cached; re-resolve and retry once
+            resp = self._list_children(self._resolve_drive_and_item(force_refresh=True))
         resp.raise_for_status()
         data = resp.json()
         items = data.get("value", [])
@@ -69,19 +127,97 @@ class SharePointConnector:
         for item in items:
             if "file" not in item:
                 continue
-            name: str = item.get("name", "")
-            lower = name.lower()
-            if not any(lower.endswith(ext) for ext in allowed_extensions):
+            if not item.get("name", "").lower().endswith(exts):
                 continue
             files.append(item)
         return files
 
-    def download_file_stream(self, drive_id: str, item_id: str) -> io.BufferedReader:
-        headers = self._headers()
-        content_url = f"{self.GRAPH_BASE}/drives/{drive_id}/items/{item_id}/content"
-        resp = self.session.get(content_url, headers=headers, stream=True, timeout=60)
+    def list_new_files_delta(self, allowed_extensions: Optional[Iterable[str]] = None) -> Dict:
+        """List files added, changed or deleted in the folder since the previous call.
+
+        Uses the Graph delta API on the drive root, filtered to the folder's direct children;
+        the first call enumerates the whole drive, later calls resume from the last
+        ``@odata.deltaLink`` and only receive changed items.
+
+        Returns a dict with ``files`` (new or changed file items), ``deleted`` (ids of removed
+        items) and ``delta_link``. The link is kept in memory for the next call but not
+        persisted; call ``save_delta_link`` once the listing's files are handled.
+        """
+        if allowed_extensions is None:
+            allowed_extensions = {".tif", ".tiff", ".jpg", ".jpeg", ".png"}
+        exts = tuple(ext.lower() for ext in allowed_extensions)
+
+        ids = self._resolve_drive_and_item()
+        url: Optional[str] = self._delta_link or self._initial_delta_url(ids)
+        files: List[Dict] = []
+        deleted: List[str] = []
+        delta_link: Optional[str] = None
+        retried = False
+        while url:
+            resp = self.session.get(url, headers=self._headers(), timeout=30)
+            if resp.status_code in (404, 410) and not retried:
+                # Drive moved (404) or delta token expired (410); start a fresh enumeration
+                retried = True
+                ids = self._resolve_drive_and_item(force_refresh=resp.status_code == 404)
+                url = self._initial_delta_url(ids)
+                files = []
+                deleted = []
+                continue
+            resp.raise_for_status()
+            data = resp.json()
+            # Filter page by page: a full enumeration covers the whole drive, not just the folder
+            for item in data.get("value", []):
+                if "deleted" in item:
+                    # Deleted items may lack name and parent, so report every id
+                    deleted.append(item["id"])
+                    continue
+                # Root delta also reports folders and items outside the watched folder
+                if "file" not in item:
+                    continue
+                if item.get("parentReference", {}).get("id") != ids["item_id"]:
+                    continue
+                if not item.get("name", "").lower().endswith(exts):
+                    continue
+                files.append(item)
+            url = data.get("@odata.nextLink")
+            delta_link = data.get("@odata.deltaLink") or delta_link
+
+        if delta_link:
+            self._delta_link = delta_link
+
+        return {"files": files, "deleted": deleted, "delta_link": delta_link}
+
+    def _initial_delta_url(self, ids: Dict[str, str]) -> str:
+        # Folder-scoped delta is not supported on SharePoint drives; use the root and filter by parent
+        return f"{self.GRAPH_BASE}/drives/{ids['drive_id']}/root/delta?$select=id,name,file,size,parentReference,deleted"
+
+    def download_slot(self) -> threading.BoundedSemaphore:
+        """Context manager reserving one of ``max_concurrency`` download slots.
+
+        Callers hold it until the stream from ``download_file_stream`` is consumed or closed;
+        the body is streamed long after the request returns.
+        """
+        return self._download_slots
+
+    def download_file_stream(self, drive_id: str, item_id: str) -> Tuple[io.BufferedReader, Optional[int]]:
+        """Open the item's content as a stream; returns it with its Content-Length, if sent."""
+        resp = self._get_content(drive_id, item_id)
+        if resp.status_code == 404:
+            # The cached drive id may be stale; re-resolve and retry once
+            resp.close()
+            drive_id = self._resolve_drive_and_item(force_refresh=True)["drive_id"]
+            resp = self._get_content(drive_id, item_id)
         resp.raise_for_status()
-        return resp.raw  # type: ignore[return-value]
+        # Let urllib3 undo any transfer compression so raw reads yield the file bytes
+        resp.raw.decode_content = True
+        length = resp.headers.get("Content-Length")
+        return resp.raw, int(length) if length is not None else None  # type: ignore[return-value]
+
+    def _get_content(self, drive_id: str, item_id: str) -> requests.Response:
+        # Identity encoding keeps Content-Length equal to the number of bytes streamed
+        headers = {**self._headers(), "Accept-Encoding": "identity"}
+        content_url = f"{self.GRAPH_BASE}/drives/{drive_id}/items/{item_id}/content"
+        return self.session.get(content_url, headers=headers, stream=True, timeout=60)
 
     def get_file_metadata(self, drive_id: str, item_id: str) -> Dict:
         headers = self._headers()
@@ -1,22 +1,23 @@
 from __future__ import annotations
 
+import queue
 import signal
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import json
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple, Union
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from prometheus_client import Counter, Histogram, make_asgi_app
 import uvicorn
 
 from .auth import AzureAuthenticator
 from .connectors import SalsifyConnector, SharePointConnector
-from .processors import FileProcessor
-from .utils import Settings, get_logger, load_settings
+from .processors import FileProcessor, PermanentFileError
+from .utils import FrozenSettings, get_logger, json_dumps, load_settings, make_session
 
 
 FILES_PROCESSED = Counter("files_processed_total", "Total files processed")
@@ -32,13 +33,65 @@ app.mount("/metrics", metrics_app)
 
 shutdown_event = threading.Event()
 
+_HEALTH_BODY = b'{"status":"ok"}'
+
 
 @app.get("/health")
-def health() -> dict:
-    return {"status": "ok"}
+def health() -> Response:
+    # Constant body returned as-is, bypassing response model serialization
+    return Response(_HEALTH_BODY, media_type="application/json")
+
+
+class _DeltaCheckpoint:
+    """Persists a listing's deltaLink only once every file it reported has finished.
+
+    Listings are checkpointed in order, so a restart resumes from the newest listing whose
+    files (and those of every earlier listing) were all transferred, skipped or given up on.
+    """
+
+    def __init__(self, sp: SharePointConnector) -> None:
+        self._sp = sp
+        self._pending: Deque[Tuple[Optional[str], Set[str]]] = deque()
+
+    def add(self, delta_link: Optional[str], item_ids: Iterable[str]) -> None:
+        self._pending.append((delta_link, set(item_ids)))
+        self._flush()
+
+    def finish(self, item_id: str) -> None:
+        for _, outstanding in self._pending:
+            outstanding.discard(item_id)
+        self._flush()
+
+    def _flush(self) -> None:
+        delta_link: Optional[str] = None
+        while self._pending and not self._pending[0][1]:
+            delta_link = self._pending.popleft()[0] or delta_link
+        if delta_link:
+            self._sp.save_delta_link(delta_link)
+
+
+def _run_lister(sp: SharePointConnector, listings: "queue.Queue[Union[Dict, Exception]]", poll_interval: int) -> None:
+    """List SharePoint changes every poll interval, handing results to the daemon loop.
+
+    Runs on its own thread so the next listing overlaps uploads of the current one. The
+    bounded queue applies backpressure when the daemon falls behind or its circuit is open.
+    """
+    while not shutdown_event.is_set():
+        result: Union[Dict, Exception]
+        try:
+            result = sp.list_new_files_delta()
+        except Exception as ex:  # noqa: BLE001
+            result = ex
+        while not shutdown_event.is_set():
+            try:
+                listings.put(result, timeout=1.0)
+                break
+            except queue.Full:
+                continue
+        shutdown_event.wait(timeout=poll_interval)
 
 
-def run_daemon(settings: Settings) -> None:
+def run_daemon(settings: FrozenSettings) -> None:
     logger = get_logger("daemon", level=settings.log_level)
     logger.info("Service starting", extra={"extra": {"poll_interval": settings.poll_interval}})
 
@@ -49,16 +102,23 @@ def run_daemon(settings: Settings) -> None:
         scopes=settings.graph_scopes,
     )
 
+    # One keep-alive pool per host, shared by both connectors and sized for the worker pool
+    session = make_session(settings.worker_threads)
     sp = SharePointConnector(
         authenticator=authenticator,
         site_id=settings.site_id,
         folder_path=settings.sharepoint_folder_path,
+        delta_state_path=Path(settings.processed_files_path).parent / "delta.txt",
+        session=session,
+        max_concurrency=settings.graph_max_concurrency,
     )
     salsify = SalsifyConnector(
         base_url=settings.salsify_base_url,
         org_id=settings.salsify_org_id,
         api_key=settings.salsify_api_key,
         auth_scheme=settings.salsify_auth_scheme,
+        session=session,
+        max_concurrency=settings.salsify_max_concurrency,
     )
 
     processor = FileProcessor(
@@ -69,68 +129,190 @@ def run_daemon(settings: Settings) -> None:
 
     failure_count = 0
     circuit_open_until = 0.0
-
-    with ThreadPoolExecutor(max_workers=settings.batch_size) as executor:
-        while not shutdown_event.is_set():
-            try:
-                now = time.time()
-                if failure_count >= settings.circuit_threshold and now < circuit_open_until:
-                    time_to_reset = int(circuit_open_until - now)
-                    logger.warning("Circuit open, skipping poll", extra={"extra": {"retry_in_seconds": time_to_reset}})
-                    shutdown_event.wait(timeout=min(settings.poll_interval, time_to_reset))
-                    continue
-
-                # Resolve drive and list files
-                ids = sp._resolve_drive_and_item()
-                drive_id = ids["drive_id"]
-                files = sp.list_new_files()
-                if not files:
-                    logger.info("No new files found")
-                else:
-                    futures = []
-                    for item in files[: settings.batch_size]:
-                        futures.append(executor.submit(processor.process_file, drive_id, item))
-
-                    for f in as_completed(futures):
-                        FILES_PROCESSED.inc()
+    # Delta listing only reports an item once, so keep unprocessed and failed items across polls
+    backlog: Dict[str, Dict] = {}
+    # Failed items rejoin the backlog with the next listing rather than being resubmitted at once
+    retry_items: Dict[str, Dict] = {}
+    # Failed attempts per item id; an item is given up on after max_retries retries
+    attempts: Dict[str, int] = {}
+    # Sliding window of submitted transfers; a new file is submitted as soon as one completes
+    in_flight: Dict[Future, Dict] = {}
+    in_flight_ids: Set[str] = set()
+    # Items re-reported while their transfer is still running; they rejoin the backlog once it settles
+    rereported: Dict[str, Dict] = {}
+    # Tallied locally and flushed to metrics when the window drains or once per poll interval
+    succeeded = failed = skipped = 0
+    last_flush = time.time()
+
+    # Kept open for the daemon's lifetime; append mode (O_APPEND) keeps each line atomic.
+    # Dead-lettering is best-effort, so an unusable path must not stop the daemon.
+    dl_fh = None
+    try:
+        dl_path = Path(settings.dead_letter_path)
+        dl_path.parent.mkdir(parents=True, exist_ok=True)
+        dl_fh = open(dl_path, "a", buffering=1, encoding="utf-8")
+    except OSError as ex:
+        logger.exception("Dead-letter file unavailable, continuing without it: %s", ex)
+
+    listings: "queue.Queue[Union[Dict, Exception]]" = queue.Queue(maxsize=2)
+    checkpoint = _DeltaCheckpoint(sp)
+
+    try:
+        lister = threading.Thread(
+            target=_run_lister, args=(sp, listings, settings.poll_interval), name="sharepoint-lister", daemon=True
+        )
+        lister.start()
+        with ThreadPoolExecutor(max_workers=settings.worker_threads) as executor:
+            # Bind attributes used on every iteration to locals (LOAD_FAST instead of LOAD_ATTR)
+            poll_interval = settings.poll_interval
+            circuit_threshold = settings.circuit_threshold
+            circuit_reset = settings.circuit_reset_seconds
+            max_in_flight = settings.worker_threads
+            max_retries = settings.max_retries
+            is_shutdown = shutdown_event.is_set
+            wait_for_shutdown = shutdown_event.wait
+            get_listing = listings.get
+            get_listing_nowait = listings.get_nowait
+            submit = executor.submit
+            process_file = processor.process_file
+            write_dead_letter = dl_fh.write if dl_fh is not None else (lambda line: 0)
+            files_processed_inc = FILES_PROCESSED.inc
+            files_succeeded_inc = FILES_SUCCEEDED.inc
+            files_failed_inc = FILES_FAILED.inc
+            now_fn = time.time
+
+            while not is_shutdown():
+                try:
+                    now = now_fn()
+                    circuit_open = failure_count >= circuit_threshold and now < circuit_open_until
+                    if circuit_open and not in_flight:
+                        time_to_reset = int(circuit_open_until - now)
+                        logger.warning("Circuit open, skipping poll", extra={"extra": {"retry_in_seconds": time_to_reset}})
+                        wait_for_shutdown(timeout=min(poll_interval, time_to_reset))
+                        continue
+
+                    if not circuit_open:
+                        # Block for the next listing only when idle; otherwise just check for one
+                        try:
+                            listing = get_listing(timeout=1.0) if not (in_flight or backlog) else get_listing_nowait()
+                        except queue.Empty:
+                            listing = None
+                        if isinstance(listing, Exception):
+                            raise listing
+                        if listing is not None:
+                            backlog.update(retry_items)
+                            retry_items.clear()
+                            # Drop deleted files so they are not retried against a 404 forever
+                            for item_id in listing["deleted"]:
+                                backlog.pop(item_id, None)
+                                rereported.pop(item_id, None)
+                                attempts.pop(item_id, None)
+                                checkpoint.finish(item_id)
+                            for item in listing["files"]:
+                                if item["id"] in in_flight_ids:
+                                    rereported[item["id"]] = item
+                                else:
+                                    backlog[item["id"]] = item
+                            checkpoint.add(listing["delta_link"], (item["id"] for item in listing["files"]))
+                            if not backlog and not in_flight:
+                                logger.info("No new files found")
+
+                        if backlog:
+                            # Drive id comes from the connector's cached resolver
+                            drive_id = sp.drive_id
+                            while backlog and len(in_flight) < max_in_flight:
+                                item = backlog.pop(next(iter(backlog)))
+                                in_flight[submit(process_file, drive_id, item)] = item
+                                in_flight_ids.add(item["id"])
+
+                    if not in_flight:
+                        continue
+
+                    done, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        item = in_flight.pop(f)
+                        in_flight_ids.discard(item["id"])
                         try:
                             res = f.result()
                             if res.get("status") == "success":
-                                FILES_SUCCEEDED.inc()
-                                logger.info("Processed file", extra={"extra": res})
+                                succeeded += 1
+                                logger.debug("Processed file", extra={"extra": res})
                                 failure_count = 0
                             else:
-                                logger.info("Skipped file", extra={"extra": res})
+                                skipped += 1
+                                logger.debug("Skipped file", extra={"extra": res})
+                            attempts.pop(item["id"], None)
+                            checkpoint.finish(item["id"])
                         except Exception as ex:  # noqa: BLE001
-                            FILES_FAILED.inc()
+                            failed += 1
                             logger.exception("File processing failed: %s", ex)
+                            permanent = isinstance(ex, PermanentFileError)
+                            tries = attempts.get(item["id"], 0) + 1
+                            if permanent:
+                                # Retrying cannot help, so the deltaLink may advance past it
+                                attempts.pop(item["id"], None)
+                                checkpoint.finish(item["id"])
+                            elif tries > max_retries:
+                                # Stop retrying until restart; leaving it unfinished holds the checkpoint
+                                # back, so the persisted deltaLink lists it again after a restart
+                                attempts.pop(item["id"], None)
+                                logger.warning(
+                                    "Giving up on file until restart",
+                                    extra={"extra": {"id": item["id"], "name": item.get("name"), "attempts": tries}},
+                                )
+                            else:
+                                # Retry after the next listing; delta listing will not report it again
+                                attempts[item["id"]] = tries
+                                retry_items.setdefault(item["id"], item)
                             # Dead-letter this file failure
                             try:
-                                dl = Path(settings.dead_letter_path)
-                                dl.parent.mkdir(parents=True, exist_ok=True)
-                                with dl.open("a", encoding="utf-8") as fh:
-                                    fh.write(json.dumps({"error": str(ex), "time": time.time()}) + "\n")
+                                write_dead_letter(
+                                    json_dumps(
+                                        {"error": str(ex), "id": item["id"], "name": item.get("name"), "time": now_fn()}
+                                    )
+                                    + "\n"
+                                )
                             except Exception:
                                 pass
-                            failure_count += 1
-
-            except Exception as ex:  # noqa: BLE001
-                logger.exception("Polling iteration failed: %s", ex)
-                # Dead letter the iteration failure for analysis
-                try:
-                    dl = Path(settings.dead_letter_path)
-                    dl.parent.mkdir(parents=True, exist_ok=True)
-                    with dl.open("a", encoding="utf-8") as fh:
-                        fh.write(json.dumps({"error": str(ex), "time": time.time()}) + "\n")
-                except Exception:
-                    pass
-                failure_count += 1
-
-            if failure_count >= settings.circuit_threshold:
-                circuit_open_until = time.time() + settings.circuit_reset_seconds
-
-            # Sleep until next poll
-            shutdown_event.wait(timeout=settings.poll_interval)
+                            # A bad name or missing source file says nothing about the health of either service
+                            if not permanent:
+                                failure_count += 1
+                        newer = rereported.pop(item["id"], None)
+                        if newer is not None:
+                            # The re-reported version supersedes any queued retry of the old one
+                            retry_items.pop(item["id"], None)
+                            backlog[item["id"]] = newer
+
+                    drained = not in_flight and not backlog
+                    if (succeeded or failed or skipped) and (drained or now_fn() - last_flush >= poll_interval):
+                        files_processed_inc(succeeded + failed + skipped)
+                        files_succeeded_inc(succeeded)
+                        files_failed_inc(failed)
+                        logger.info(
+                            "Transfers complete",
+                            extra={"extra": {"succeeded": succeeded, "failed": failed, "skipped": skipped}},
+                        )
+                        succeeded = failed = skipped = 0
+                        last_flush = now_fn()
+
+                except Exception as ex:  # noqa: BLE001
+                    logger.exception("Polling iteration failed: %s", ex)
+                    # Dead letter the iteration failure for analysis
+                    try:
+                        write_dead_letter(json_dumps({"error": str(ex), "time": now_fn()}) + "\n")
+                    except Exception:
+                        pass
+                    failure_count += 1
+
+                if failure_count >= circuit_threshold:
+                    circuit_open_until = now_fn() + circuit_reset
+                    # Failures during a detected outage say nothing about the files; keep their budget
+                    attempts.clear()
+    finally:
+        if dl_fh is not None:
+            dl_fh.close()
+        processor.close()
+        authenticator.close()
 
 
 def _signal_handler(signum, frame):  # type: ignore[no-untyped-def]
@@ -149,7 +331,14 @@ def main() -> None:
     signal.signal(signal.SIGTERM, _signal_handler)
     signal.signal(signal.SIGINT, _signal_handler)
 
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level=settings.log_level.lower())
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        log_level=settings.log_level.lower(),
+        loop="uvloop",
+        http="httptools",
+    )
 
 
 if __name__ == "__main__":
@@ -1,4 +1,3 @@
-from .file_processor import FileProcessor
-
-__all__ = ["FileProcessor"]
+from .file_processor import FileProcessor, PermanentFileError
 
+__all__ = ["FileProcessor", "PermanentFileError"]
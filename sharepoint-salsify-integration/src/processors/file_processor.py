@@ -1,19 +1,28 @@
 from __future__ import annotations
 
 import io
-import json
+import os
 import re
+import threading
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
+
+from requests import HTTPError
 
 from ..connectors import SalsifyConnector, SharePointConnector
-from ..utils import get_logger
+from ..utils import get_logger, json_loads
+
+
+class PermanentFileError(Exception):
+    """The file itself cannot be transferred (unparseable name, gone from SharePoint); retrying will not help."""
 
 
 class FileProcessor:
     """Orchestrates file validation, parsing and transfer from SharePoint to Salsify."""
 
     IMAGE_EXTENSIONS = {".tif", ".tiff", ".jpg", ".jpeg", ".png"}
+    # PRODUCTCODE_TYPE_VERSION[_...] matched against the stem; trailing parts are ignored
+    _NAME_RE = re.compile(r"^(?P<code>[^_]*)_(?P<type>[^_]*)_(?P<ver>[^_]*)")
 
     def __init__(
         self,
@@ -25,38 +34,53 @@ class FileProcessor:
         self.salsify_connector = salsify_connector
         self.processed_files_path = processed_files_path
         self.logger = get_logger("processor")
+        self._ext_tuple = tuple(self.IMAGE_EXTENSIONS)
         self._load_processed()
+        # Append-only log: one processed filename per line, line-buffered
+        self.processed_files_path.parent.mkdir(parents=True, exist_ok=True)
+        self._log_fh = open(self.processed_files_path, "a", buffering=1, encoding="utf-8")
+        # Guards updates to `processed` and the log; never held during network I/O
+        self._processed_lock = threading.Lock()
+        # name -> claim token of the worker transferring it; dict.setdefault is atomic under the GIL
+        self._claims: Dict[str, object] = {}
 
     def _load_processed(self) -> None:
-        self.processed: Dict[str, bool] = {}
+        self.processed: Set[str] = set()
         try:
-            if self.processed_files_path.exists():
-                data = json.loads(self.processed_files_path.read_text(encoding="utf-8") or "[]")
-                if isinstance(data, list):
-                    self.processed = {str(x): True for x in data}
+            if self.processed_files_path.exists() and self.processed_files_path.stat().st_size > 0:
+                with self.processed_files_path.open("r", encoding="utf-8") as fh:
+                    for line in fh:
+                        name = line.rstrip("\n")
+                        if name:
+                            self.processed.add(name)
+            else:
+                # Missing or empty log: import the JSON list written by earlier versions
+                self._migrate_legacy_json()
         except Exception:
-            self.processed = {}
-
-    def _save_processed(self) -> None:
-        try:
-            items = sorted(self.processed.keys())
+            self.processed = set()
+
+    def _migrate_legacy_json(self) -> None:
+        legacy = self.processed_files_path.with_suffix(".json")
+        if legacy == self.processed_files_path or not legacy.exists():
+            return
+        data = json_loads(legacy.read_bytes() or b"[]")
+        if isinstance(data, list):
+            self.processed = {str(x) for x in data}
             self.processed_files_path.parent.mkdir(parents=True, exist_ok=True)
-            self.processed_files_path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
-        except Exception:
-            pass
+            self.processed_files_path.write_text("".join(f"{x}\n" for x in sorted(self.processed)), encoding="utf-8")
+
+    def close(self) -> None:
+        self._log_fh.close()
 
     def extract_product_code(self, filename: str) -> Tuple[str, str, str]:
         # Expected: PRODUCTCODE_TYPE_VERSION.ext
-        name = Path(filename).stem
-        parts = name.split("_")
-        if len(parts) < 3:
+        m = self._NAME_RE.match(os.path.splitext(os.path.basename(filename))[0])
+        if not m:
             raise ValueError("Filename must be PRODUCTCODE_TYPE_VERSION.ext")
-        return parts[0], parts[1], parts[2]
+        return m["code"], m["type"], m["ver"]
 
     def validate_file(self, item: Dict) -> bool:
-        name = item.get("name", "")
-        suffix = Path(name.lower()).suffix
-        return suffix in self.IMAGE_EXTENSIONS
+        return item.get("name", "").lower().endswith(self._ext_tuple)
 
     def process_file(self, drive_id: str, item: Dict) -> Dict:
         item_id = item["id"]
@@ -67,10 +91,42 @@ class FileProcessor:
         if not self.validate_file(item):
             return {"status": "skipped", "reason": "invalid_extension", "name": name}
 
-        product_code, image_type, version = self.extract_product_code(name)
+        try:
+            product_code, image_type, version = self.extract_product_code(name)
+        except ValueError as ex:
+            raise PermanentFileError(str(ex)) from ex
+
+        # Lock-free claim: only the worker whose token lands in the dict transfers the file
+        claim = object()
+        if self._claims.setdefault(name, claim) is not claim:
+            return {"status": "skipped", "reason": "in_progress", "name": name}
+        if name in self.processed:
+            # Another worker finished it between the check and the claim
+            self._claims.pop(name, None)
+            return {"status": "skipped", "reason": "already_processed", "name": name}
 
-        stream = self.sp_connector.download_file_stream(drive_id=drive_id, item_id=item_id)
-        result = self.salsify_connector.upload_asset(stream, filename=name)
+        try:
+            # Upload slot first, so a download is only opened when it can be consumed at once;
+            # the download slot is held until its stream is closed
+            with self.salsify_connector.upload_slot(), self.sp_connector.download_slot():
+                try:
+                    stream, length = self.sp_connector.download_file_stream(drive_id=drive_id, item_id=item_id)
+                except HTTPError as ex:
+                    if ex.response is not None and ex.response.status_code in (404, 410):
+                        raise PermanentFileError(f"{name} is no longer in SharePoint") from ex
+                    raise
+                if length is None:
+                    # No Content-Length (e.g. a chunked redirect target); the listed size is checked
+                    # against the bytes actually streamed, so a stale value fails instead of corrupting
+                    length = item.get("size")
+                try:
+                    result = self.salsify_connector.upload_asset(stream, filename=name, size=length)
+                finally:
+                    stream.close()
+        except Exception:
+            # Release the claim so the file can be retried
+            self._claims.pop(name, None)
+            raise
         asset_id = result.get("id") or result.get("asset_id") or ""
 
         # Optionally associate asset to product
@@ -79,7 +135,10 @@ class FileProcessor:
         except Exception:
             pass
 
-        self.processed[name] = True
-        self._save_processed()
+        with self._processed_lock:
+            self.processed.add(name)
+            self._log_fh.write(name + "\n")
+            self._log_fh.flush()
+        # Released only after `processed` is updated, so a racing worker's re-check sees it
+        self._claims.pop(name, None)
         return {"status": "success", "asset_id": asset_id, "name": name, "product_code": product_code}
-
@@ -1,5 +1,6 @@
-from .config import Settings, load_settings
+from .config import FrozenSettings, Settings, load_settings
+from .http import make_adapter, make_session
+from .json_codec import dumps as json_dumps, loads as json_loads
 from .logger import get_logger
 
-__all__ = ["Settings", "load_settings", "get_logger"]
-
+__all__ = ["FrozenSettings", "Settings", "load_settings", "get_logger", "json_dumps", "json_loads", "make_adapter", "make_session"]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from dataclasses import make_dataclass
 from pathlib import Path
 from typing import Optional
 
@@ -31,18 +32,35 @@ class Settings(BaseModel):
     poll_interval: int = Field(300, alias="POLL_INTERVAL")
     log_level: str = Field("INFO", alias="LOG_LEVEL")
     max_retries: int = Field(3, alias="MAX_RETRIES")
-    batch_size: int = Field(10, alias="BATCH_SIZE")
+    # Transfers are network-bound, so run far more threads than CPUs
+    worker_threads: int = Field(32, alias="WORKER_THREADS")
+    # Each transfer holds an upload slot and, inside it, a download slot, so transfers run at
+    # min(worker_threads, salsify_max_concurrency, graph_max_concurrency). The Graph cap only
+    # takes effect when set below the Salsify cap; lower either to respect API throttling.
+    salsify_max_concurrency: int = Field(32, alias="SALSIFY_MAX_CONCURRENCY")
+    graph_max_concurrency: int = Field(32, alias="GRAPH_MAX_CONCURRENCY")
     circuit_threshold: int = Field(5, alias="CIRCUIT_THRESHOLD")
     circuit_reset_seconds: int = Field(60, alias="CIRCUIT_RESET_SECONDS")
 
     # Paths
-    processed_files_path: str = Field(default=str(Path(__file__).resolve().parents[2] / "data" / "processed_files.json"))
+    processed_files_path: str = Field(default=str(Path(__file__).resolve().parents[2] / "data" / "processed_files.log"))
     dead_letter_path: str = Field(default=str(Path(__file__).resolve().parents[2] / "data" / "dead_letter.jsonl"))
 
     class Config:
         populate_by_name = True
 
 
+# Read-only, fixed-shape copy of a validated Settings. Fields live in __slots__, so the
+# daemon's per-poll reads are plain slot lookups instead of pydantic attribute access.
+FrozenSettings = make_dataclass(
+    "FrozenSettings",
+    [(name, field.annotation) for name, field in Settings.model_fields.items()],
+    frozen=True,
+    slots=True,
+)
+FrozenSettings.__module__ = __name__
+
+
 def _read_yaml_config(config_path: Path) -> dict:
     if not config_path.exists():
         return {}
@@ -50,8 +68,8 @@ def _read_yaml_config(config_path: Path) -> dict:
         return yaml.safe_load(f) or {}
 
 
-def load_settings(project_root: Optional[Path] = None) -> Settings:
-    """Load environment variables and YAML settings into a Settings object."""
+def load_settings(project_root: Optional[Path] = None) -> FrozenSettings:
+    """Load environment variables and YAML settings, validate them and return a FrozenSettings."""
     if project_root is None:
         project_root = Path(__file__).resolve().parents[2]
 
@@ -65,5 +83,11 @@ def load_settings(project_root: Optional[Path] = None) -> Settings:
     yaml_data = _read_yaml_config(yaml_path)
 
     # Environment overrides YAML via pydantic model aliases
-    return Settings(**yaml_data)
+    env_data = {
+        field.alias: os.environ[field.alias]
+        for field in Settings.model_fields.values()
+        if field.alias and field.alias in os.environ
+    }
+    settings = Settings(**{**yaml_data, **env_data})
+    return FrozenSettings(**settings.model_dump())
 
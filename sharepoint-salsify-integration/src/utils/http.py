@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_adapter(pool_size: int = 10) -> HTTPAdapter:
+    """Build a retrying adapter whose pool fits ``pool_size`` concurrent workers."""
+    retries = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    return HTTPAdapter(
+        max_retries=retries,
+        pool_connections=max(10, pool_size),
+        pool_maxsize=max(20, pool_size * 2),
+    )
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """Build a keep-alive session that can be shared by several connectors."""
+    session = requests.Session()
+    adapter = make_adapter(pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+    return session
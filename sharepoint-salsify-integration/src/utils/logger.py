@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Any, Dict
 
+from .json_codec import dumps
+
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:  # type: ignore[override]
@@ -20,7 +21,7 @@ class JsonFormatter(logging.Formatter):
             log_record["exc_info"] = self.formatException(record.exc_info)
         if hasattr(record, "extra") and isinstance(record.extra, dict):
             log_record.update(record.extra)
-        return json.dumps(log_record, ensure_ascii=False)
+        return dumps(log_record)
 
 
 def get_logger(name: str = "app", level: str | int = "INFO") -> logging.Logger:
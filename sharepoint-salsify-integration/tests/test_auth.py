@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+import time
 import types
 
 from src.auth.azure_auth import AzureAuthenticator
@@ -7,8 +9,10 @@ import msal
 
 
 class DummyApp:
-    def __init__(self) -> None:
+    def __init__(self, expires_in=3600, delay=0.0) -> None:
         self.calls = 0
+        self.expires_in = expires_in
+        self.delay = delay
 
     def get_accounts(self):  # noqa: D401
         return []
@@ -18,7 +22,9 @@ class DummyApp:
 
     def acquire_token_for_client(self, scopes):  # noqa: D401
         self.calls += 1
-        return {"access_token": "test", "expires_in": 3600}
+        time.sleep(self.delay)
+        token = "test" if self.calls == 1 else f"test{self.calls}"
+        return {"access_token": token, "expires_in": self.expires_in}
 
 
 def test_get_access_token_monkeypatch(monkeypatch):
@@ -32,3 +38,41 @@ def test_get_access_token_monkeypatch(monkeypatch):
     assert token == "test"
     assert dummy.calls == 1
 
+
+def test_get_access_token_reuses_cached_token(monkeypatch):
+    monkeypatch.setattr(msal, "ConfidentialClientApplication", lambda **kwargs: DummyApp())
+
+    auth = AzureAuthenticator("tenant", "client", "secret")
+    assert auth.get_access_token() == auth.get_access_token() == "test"
+    assert auth._app.calls == 1  # type: ignore[attr-defined]
+    auth.close()
+
+
+def test_background_refresh_replaces_token(monkeypatch):
+    monkeypatch.setattr(msal, "ConfidentialClientApplication", lambda **kwargs: DummyApp(expires_in=0.5))
+
+    auth = AzureAuthenticator("tenant", "client", "secret", token_refresh_margin_seconds=0)
+    auth.REFRESH_RETRY_SECONDS = 0.05
+    assert auth.get_access_token() == "test"
+
+    deadline = time.time() + 5
+    while auth._token_state[0] == "test" and time.time() < deadline:  # type: ignore[index]
+        time.sleep(0.01)
+    auth.close()
+    assert auth._token_state[0] != "test"  # type: ignore[index]
+
+
+def test_concurrent_callers_share_one_acquisition(monkeypatch):
+    monkeypatch.setattr(msal, "ConfidentialClientApplication", lambda **kwargs: DummyApp(delay=0.2))
+
+    auth = AzureAuthenticator("tenant", "client", "secret")
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(auth.get_access_token())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    auth.close()
+
+    assert tokens == ["test"] * 8
+    assert auth._app.calls == 1  # type: ignore[attr-defined]
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+from src.utils.config import FrozenSettings, Settings, load_settings
+
+
+REQUIRED_ENV = {
+    "TENANT_ID": "tenant",
+    "CLIENT_ID": "client",
+    "CLIENT_SECRET": "secret",
+    "SITE_ID": "site",
+    "SALSIFY_API_KEY": "key",
+    "SALSIFY_ORG_ID": "org",
+}
+
+
+def test_load_settings_returns_frozen_slotted_settings(tmp_path, monkeypatch):
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "settings.yaml").write_text("poll_interval: 300\nworker_threads: 32\n", encoding="utf-8")
+    for key, value in REQUIRED_ENV.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("POLL_INTERVAL", "7")
+    monkeypatch.delenv("WORKER_THREADS", raising=False)
+
+    settings = load_settings(tmp_path)
+
+    assert isinstance(settings, FrozenSettings)
+    assert {f.name for f in dataclasses.fields(settings)} == set(Settings.model_fields)
+    assert not hasattr(settings, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.poll_interval = 1
+
+    # Aliased environment variables override YAML; YAML still applies where unset
+    assert settings.tenant_id == "tenant"
+    assert settings.salsify_org_id == "org"
+    assert settings.poll_interval == 7
+    assert settings.worker_threads == 32
@@ -1,10 +1,49 @@
 from __future__ import annotations
 
 import io
+import time
 
 import pytest
 
 from src.connectors.salsify_connector import SalsifyConnector
+from src.connectors.sharepoint_connector import SharePointConnector
+
+
+class DummyAuth:
+    token_refresh_margin_seconds = 60
+
+    def __init__(self, expires_in=3600):
+        self.calls = 0
+        self.expires_in = expires_in
+
+    def get_token_and_expiry(self):  # noqa: D401
+        self.calls += 1
+        return f"token{self.calls}", time.time() + self.expires_in
+
+
+class DummyResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self):  # noqa: D401
+        return self._payload
+
+    def raise_for_status(self):  # noqa: D401
+        return None
+
+
+class SocketLikeStream(io.RawIOBase):
+    """Readable stream whose fileno() would make MultipartEncoder see 0 bytes."""
+
+    def __init__(self, payload):
+        self._buf = io.BytesIO(payload)
+
+    def readable(self):  # noqa: D401
+        return True
+
+    def readinto(self, b):  # noqa: D401
+        return self._buf.readinto(b)
 
 
 def test_salsify_headers_bearer():
@@ -16,3 +55,169 @@ def test_salsify_headers_x_api_key():
     c = SalsifyConnector(base_url="https://api.salsify.com", org_id="o", api_key="k", auth_scheme="X-API-KEY")
     assert c._headers()["X-API-KEY"] == "k"
 
+
+def test_sharepoint_resolve_drive_and_item_is_cached(monkeypatch):
+    c = SharePointConnector(authenticator=DummyAuth(), site_id="site", folder_path="/Shared Documents/Images/")
+    calls = []
+
+    def fake_get(url, headers=None, timeout=None, **kwargs):
+        calls.append(url)
+        return DummyResponse({"id": "drive1" if url.endswith("/drive") else "folder1"})
+
+    monkeypatch.setattr(c.session, "get", fake_get)
+
+    assert c._resolve_drive_and_item() == {"drive_id": "drive1", "item_id": "folder1"}
+    assert c.drive_id == "drive1"
+    assert len(calls) == 2
+
+    c._resolve_drive_and_item(force_refresh=True)
+    assert len(calls) == 4
+
+
+def test_sharepoint_list_new_files_delta_follows_pages(monkeypatch, tmp_path):
+    state = tmp_path / "delta.txt"
+    c = SharePointConnector(authenticator=DummyAuth(), site_id="site", folder_path="Images", delta_state_path=state)
+    monkeypatch.setattr(c, "_resolve_drive_and_item", lambda force_refresh=False: {"drive_id": "d", "item_id": "f"})
+    parent = {"id": "f"}
+    pages = {
+        "page2": {
+            "value": [
+                {"id": "3", "deleted": {"state": "deleted"}},
+                {"id": "4", "name": "D_FRONT_01.jpg", "file": {}, "parentReference": {"id": "sub"}},
+            ],
+            "@odata.deltaLink": "next-delta",
+        },
+    }
+    urls = []
+
+    def fake_get(url, headers=None, timeout=None, **kwargs):
+        urls.append(url)
+        if url in pages:
+            return DummyResponse(pages[url])
+        return DummyResponse(
+            {
+                "value": [
+                    {"id": "1", "name": "A_FRONT_01.jpg", "file": {}, "parentReference": parent},
+                    {"id": "2", "name": "notes.txt", "file": {}, "parentReference": parent},
+                ],
+                "@odata.nextLink": "page2",
+            }
+        )
+
+    monkeypatch.setattr(c.session, "get", fake_get)
+
+    listing = c.list_new_files_delta()
+    assert [f["id"] for f in listing["files"]] == ["1"]
+    assert listing["deleted"] == ["3"]
+    assert listing["delta_link"] == "next-delta"
+    assert "/drives/d/root/delta" in urls[0]
+
+    # The next listing resumes from the new link, but nothing is persisted until saved
+    first_call_requests = len(urls)
+    c.list_new_files_delta()
+    assert urls[first_call_requests] == "next-delta"
+    assert not state.exists()
+
+    c.save_delta_link(listing["delta_link"])
+    c2 = SharePointConnector(authenticator=DummyAuth(), site_id="site", folder_path="Images", delta_state_path=state)
+    assert c2._delta_link == "next-delta"
+
+
+def test_salsify_upload_asset_streams_multipart(monkeypatch):
+    c = SalsifyConnector(base_url="https://api.salsify.com/", org_id="o", api_key="k")
+    captured = {}
+
+    def fake_post(url, headers=None, data=None, timeout=None, **kwargs):
+        captured["url"] = url
+        captured["headers"] = headers
+        captured["body"] = data.read()
+        return DummyResponse({"id": "asset1"})
+
+    monkeypatch.setattr(c.session, "post", fake_post)
+
+    assert c.upload_asset(io.BytesIO(b"imagebytes"), filename="A_FRONT_01.png", content_type="image/png") == {"id": "asset1"}
+    assert captured["url"] == "https://api.salsify.com/v1/orgs/o/assets"
+    assert captured["headers"]["Authorization"] == "Bearer k"
+    assert captured["headers"]["Content-Type"].startswith("multipart/form-data; boundary=")
+    assert b"imagebytes" in captured["body"]
+    assert b'filename="A_FRONT_01.png"' in captured["body"]
+
+
+def test_salsify_upload_asset_sized_stream(monkeypatch):
+    c = SalsifyConnector(base_url="https://api.salsify.com", org_id="o", api_key="k")
+    captured = {}
+
+    def fake_post(url, headers=None, data=None, timeout=None, **kwargs):
+        captured["len"] = data.len
+        captured["body"] = data.read()
+        return DummyResponse({"id": "asset1"})
+
+    monkeypatch.setattr(c.session, "post", fake_post)
+
+    payload = b"x" * 200_000
+    c.upload_asset(SocketLikeStream(payload), filename="A_FRONT_01.TIF", size=len(payload))
+    assert captured["len"] == len(captured["body"])
+    assert payload in captured["body"]
+    assert b"Content-Type: image/tiff" in captured["body"]
+
+
+def test_sharepoint_headers_cached_until_token_expiry():
+    auth = DummyAuth()
+    c = SharePointConnector(authenticator=auth, site_id="site", folder_path="Images")
+    assert c._headers() == {"Authorization": "Bearer token1"}
+    assert c._headers() == {"Authorization": "Bearer token1"}
+    assert auth.calls == 1
+
+    expiring = DummyAuth(expires_in=30)
+    c2 = SharePointConnector(authenticator=expiring, site_id="site", folder_path="Images")
+    c2._headers()
+    assert c2._headers() == {"Authorization": "Bearer token2"}
+
+
+def test_salsify_upload_asset_rejects_mis_sized_or_unsized_streams(monkeypatch):
+    c = SalsifyConnector(base_url="https://api.salsify.com", org_id="o", api_key="k")
+    monkeypatch.setattr(c.session, "post", lambda url, data=None, **kwargs: DummyResponse({"id": data.read()}))
+
+    with pytest.raises(IOError):
+        c.upload_asset(SocketLikeStream(b"short"), filename="A_FRONT_01.jpg", size=100)
+    with pytest.raises(IOError):
+        c.upload_asset(SocketLikeStream(b"too long"), filename="A_FRONT_01.jpg", size=3)
+    with pytest.raises(IOError):
+        c.upload_asset(SocketLikeStream(b"unsized"), filename="A_FRONT_01.jpg")
+
+
+def test_sharepoint_download_file_stream_returns_content_length(monkeypatch):
+    class StreamResponse(DummyResponse):
+        def __init__(self):
+            super().__init__(None)
+            self.headers = {"Content-Length": "5"}
+            self.raw = SocketLikeStream(b"bytes")
+
+    c = SharePointConnector(authenticator=DummyAuth(), site_id="site", folder_path="Images")
+    seen = {}
+
+    def fake_get(url, headers=None, **kwargs):
+        seen.update(headers)
+        return StreamResponse()
+
+    monkeypatch.setattr(c.session, "get", fake_get)
+
+    stream, length = c.download_file_stream("d", "i")
+    assert length == 5
+    assert stream.read() == b"bytes"
+    assert seen["Accept-Encoding"] == "identity"
+
+
+def test_connector_slots_cap_concurrency():
+    salsify = SalsifyConnector(base_url="https://api.salsify.com", org_id="o", api_key="k", max_concurrency=1)
+    sp = SharePointConnector(authenticator=DummyAuth(), site_id="site", folder_path="Images", max_concurrency=2)
+
+    with salsify.upload_slot():
+        assert not salsify.upload_slot().acquire(blocking=False)
+    assert salsify.upload_slot().acquire(blocking=False)
+    salsify.upload_slot().release()
+
+    with sp.download_slot(), sp.download_slot():
+        assert not sp.download_slot().acquire(blocking=False)
+    assert sp.download_slot().acquire(blocking=False)
+    sp.download_slot().release()
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+import src.main as main
+from src.utils.config import FrozenSettings, Settings
+
+
+class DummyAuth:
+    closed = 0
+
+    def __init__(self, **kwargs):  # noqa: D401
+        pass
+
+    def close(self):  # noqa: D401
+        DummyAuth.closed += 1
+
+
+def _not_found():
+    resp = requests.Response()
+    resp.status_code = 404
+    return requests.HTTPError("404 Not Found", response=resp)
+
+
+class DummySP:
+    """Serves scripted delta listings keyed by the current deltaLink; persists into `state`.
+
+    Content requests for `missing` item ids fail with a Graph 404.
+    """
+
+    def __init__(self, state, listings, missing=()):
+        self.state = state
+        self.listings = listings
+        self.missing = set(missing)
+        self.drive_id = "drive"
+        self._link = state.get("delta_link")
+        self.calls = 0
+
+    def list_new_files_delta(self):  # noqa: D401
+        self.calls += 1
+        listing = self.listings.get(self._link, {"files": [], "deleted": [], "delta_link": self._link})
+        self._link = listing["delta_link"]
+        return listing
+
+    def save_delta_link(self, delta_link):  # noqa: D401
+        self.state["delta_link"] = delta_link
+
+    def download_slot(self):  # noqa: D401
+        return contextlib.nullcontext()
+
+    def download_file_stream(self, drive_id, item_id):  # noqa: D401
+        if item_id in self.missing:
+            raise _not_found()
+        return io.BytesIO(b"data"), 4
+
+
+class DummySalsify:
+    """Fails uploads of `failing` names always, and of `fail_times` names that many times.
+
+    Uploads of `gated` names block until `gate` is set.
+    """
+
+    def __init__(self, failing=(), fail_times=None, error=lambda: RuntimeError("upload failed"), gated=()):
+        self.failing = set(failing)
+        self.gated = set(gated)
+        self.gate = threading.Event()
+        self.fail_times = dict(fail_times or {})
+        self.error = error
+        self.attempts = []
+        self.uploaded = []
+
+    def upload_slot(self):  # noqa: D401
+        return contextlib.nullcontext()
+
+    def upload_asset(self, file_stream, filename, content_type=None, size=None):  # noqa: D401
+        self.attempts.append(filename)
+        if filename in self.gated:
+            self.gate.wait(timeout=10)
+        if filename in self.failing:
+            raise self.error()
+        if self.fail_times.get(filename, 0) > 0:
+            self.fail_times[filename] -= 1
+            raise self.error()
+        self.uploaded.append(filename)
+        return {"id": f"asset-{filename}"}
+
+    def update_product_association(self, product_code, asset_id):  # noqa: D401
+        return None
+
+
+def _item(item_id, name):
+    return {"id": item_id, "name": name, "size": 4}
+
+
+def _settings(tmp_path, dead_letter_path=None, **overrides):
+    settings = Settings(
+        TENANT_ID="t",
+        CLIENT_ID="c",
+        CLIENT_SECRET="s",
+        SITE_ID="site",
+        SALSIFY_API_KEY="k",
+        SALSIFY_ORG_ID="o",
+        POLL_INTERVAL=1,
+        WORKER_THREADS=4,
+        processed_files_path=str(tmp_path / "processed_files.log"),
+        dead_letter_path=str(dead_letter_path or tmp_path / "dead_letter.jsonl"),
+        **overrides,
+    )
+    return FrozenSettings(**settings.model_dump())
+
+
+def _run_daemon(monkeypatch, tmp_path, sp, salsify, until, timeout=5.0, settings=None):
+    monkeypatch.setattr(main, "AzureAuthenticator", DummyAuth)
+    monkeypatch.setattr(main, "SharePointConnector", lambda **kwargs: sp)
+    monkeypatch.setattr(main, "SalsifyConnector", lambda **kwargs: salsify)
+    main.shutdown_event.clear()
+    t = threading.Thread(target=main.run_daemon, args=(settings or _settings(tmp_path),))
+    t.start()
+    try:
+        deadline = time.time() + timeout
+        while not until() and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        main.shutdown_event.set()
+        t.join(timeout=10)
+        main.shutdown_event.clear()
+    assert not t.is_alive()
+
+
+def test_run_daemon_restart_relists_unfinished_files(monkeypatch, tmp_path):
+    state = {}
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg"), _item("2", "B_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"}}
+
+    salsify = DummySalsify(failing={"B_FRONT_01.jpg"})
+    _run_daemon(
+        monkeypatch, tmp_path, DummySP(state, listings), salsify,
+        until=lambda: "A_FRONT_01.jpg" in salsify.uploaded and "B_FRONT_01.jpg" in salsify.attempts,
+    )
+    # B is unfinished, so the listing that reported it must not be checkpointed
+    assert "delta_link" not in state
+
+    salsify2 = DummySalsify()
+    _run_daemon(
+        monkeypatch, tmp_path, DummySP(state, listings), salsify2,
+        until=lambda: "delta_link" in state,
+    )
+    assert salsify2.uploaded == ["B_FRONT_01.jpg"]
+    assert state["delta_link"] == "d1"
+
+
+def test_run_daemon_drops_deleted_files_from_retries(monkeypatch, tmp_path):
+    state = {}
+    listings = {
+        None: {"files": [_item("1", "A_FRONT_01.jpg"), _item("2", "B_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"},
+        "d1": {"files": [], "deleted": ["2"], "delta_link": "d2"},
+    }
+    salsify = DummySalsify(failing={"B_FRONT_01.jpg"})
+    _run_daemon(monkeypatch, tmp_path, DummySP(state, listings), salsify, until=lambda: state.get("delta_link") == "d2")
+
+    assert state["delta_link"] == "d2"
+    assert salsify.attempts.count("B_FRONT_01.jpg") == 1
+
+
+def test_run_daemon_keeps_running_without_dead_letter_file(monkeypatch, tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("", encoding="utf-8")
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg"), _item("2", "B_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"}}
+    salsify = DummySalsify(failing={"B_FRONT_01.jpg"})
+
+    _run_daemon(
+        monkeypatch, tmp_path, DummySP({}, listings), salsify,
+        until=lambda: "A_FRONT_01.jpg" in salsify.uploaded and "B_FRONT_01.jpg" in salsify.attempts,
+        settings=_settings(tmp_path, dead_letter_path=blocker / "dead_letter.jsonl"),
+    )
+    assert salsify.uploaded == ["A_FRONT_01.jpg"]
+
+
+def test_run_daemon_uploads_checkpoints_and_flushes_metrics(monkeypatch, tmp_path):
+    state = {}
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg"), _item("2", "B_FRONT_01.png")], "deleted": [], "delta_link": "d1"}}
+    salsify = DummySalsify()
+    succeeded = main.FILES_SUCCEEDED._value.get()
+    processed = main.FILES_PROCESSED._value.get()
+
+    _run_daemon(
+        monkeypatch, tmp_path, DummySP(state, listings), salsify,
+        until=lambda: main.FILES_SUCCEEDED._value.get() - succeeded >= 2 and "delta_link" in state,
+    )
+    assert sorted(salsify.uploaded) == ["A_FRONT_01.jpg", "B_FRONT_01.png"]
+    assert state["delta_link"] == "d1"
+    assert main.FILES_SUCCEEDED._value.get() - succeeded == 2
+    assert main.FILES_PROCESSED._value.get() - processed == 2
+    logged = (tmp_path / "processed_files.log").read_text(encoding="utf-8").split()
+    assert sorted(logged) == ["A_FRONT_01.jpg", "B_FRONT_01.png"]
+
+
+def test_run_daemon_requeues_failures_until_they_succeed(monkeypatch, tmp_path):
+    state = {}
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"}}
+    salsify = DummySalsify(fail_times={"A_FRONT_01.jpg": 1})
+    failed = main.FILES_FAILED._value.get()
+
+    _run_daemon(monkeypatch, tmp_path, DummySP(state, listings), salsify, until=lambda: "delta_link" in state)
+
+    assert salsify.attempts == ["A_FRONT_01.jpg", "A_FRONT_01.jpg"]
+    assert salsify.uploaded == ["A_FRONT_01.jpg"]
+    assert main.FILES_FAILED._value.get() - failed == 1
+
+
+def test_run_daemon_stops_retrying_after_max_retries_without_checkpointing(monkeypatch, tmp_path):
+    state = {}
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"}}
+    salsify = DummySalsify(failing={"A_FRONT_01.jpg"})
+    sp = DummySP(state, listings)
+
+    _run_daemon(
+        monkeypatch, tmp_path, sp, salsify,
+        until=lambda: len(salsify.attempts) >= 2 and sp.calls >= 4,
+        settings=_settings(tmp_path, MAX_RETRIES=1),
+    )
+    # One attempt plus one retry; the file stays unfinished so a restart lists it again
+    assert salsify.attempts == ["A_FRONT_01.jpg", "A_FRONT_01.jpg"]
+    assert "delta_link" not in state
+    dead = [json.loads(line) for line in (tmp_path / "dead_letter.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [entry["id"] for entry in dead] == ["1", "1"]
+
+
+def test_run_daemon_keeps_retry_budget_during_an_outage(monkeypatch, tmp_path):
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"}}
+    salsify = DummySalsify(failing={"A_FRONT_01.jpg"})
+
+    _run_daemon(
+        monkeypatch, tmp_path, DummySP({}, listings), salsify,
+        until=lambda: len(salsify.attempts) >= 3,
+        timeout=10.0,
+        settings=_settings(tmp_path, MAX_RETRIES=1, CIRCUIT_THRESHOLD=1, CIRCUIT_RESET_SECONDS=1),
+    )
+    # Every failure trips the breaker, so none is charged to the file
+    assert len(salsify.attempts) >= 3
+
+
+def test_run_daemon_retries_salsify_client_errors(monkeypatch, tmp_path):
+    state = {}
+    listings = {None: {"files": [_item("1", "A_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"}}
+    salsify = DummySalsify(fail_times={"A_FRONT_01.jpg": 1}, error=_not_found)
+
+    _run_daemon(monkeypatch, tmp_path, DummySP(state, listings), salsify, until=lambda: "delta_link" in state)
+
+    assert salsify.attempts == ["A_FRONT_01.jpg", "A_FRONT_01.jpg"]
+    assert salsify.uploaded == ["A_FRONT_01.jpg"]
+
+
+@pytest.mark.parametrize("item, missing", [(_item("1", "BADNAME.jpg"), ()), (_item("1", "A_FRONT_01.jpg"), ("1",))])
+def test_run_daemon_does_not_retry_permanent_failures(monkeypatch, tmp_path, item, missing):
+    state = {}
+    listings = {None: {"files": [item], "deleted": [], "delta_link": "d1"}}
+    failed = main.FILES_FAILED._value.get()
+    sp = DummySP(state, listings, missing=missing)
+
+    # Run on until later listings, which would carry a retry, have been delivered
+    _run_daemon(monkeypatch, tmp_path, sp, DummySalsify(), until=lambda: "delta_link" in state and sp.calls >= 3)
+
+    assert main.FILES_FAILED._value.get() - failed == 1
+    assert state["delta_link"] == "d1"
+
+
+def test_run_daemon_holds_rereported_items_until_their_transfer_settles(monkeypatch, tmp_path):
+    state = {}
+    listings = {
+        None: {"files": [_item("1", "A_FRONT_01.jpg")], "deleted": [], "delta_link": "d1"},
+        "d1": {"files": [_item("1", "A_FRONT_01.jpg")], "deleted": [], "delta_link": "d2"},
+    }
+    salsify = DummySalsify(gated={"A_FRONT_01.jpg"})
+    sp = DummySP(state, listings)
+    while_running = {}
+
+    def until():
+        if not salsify.gate.is_set():
+            # Release the transfer once both listings have reached the daemon, or as soon as a
+            # deltaLink is persisted while it is still running
+            if state or sp.calls >= 4:
+                while_running.update(state)
+                salsify.gate.set()
+            return False
+        return state.get("delta_link") == "d2"
+
+    _run_daemon(monkeypatch, tmp_path, sp, salsify, until=until, timeout=10.0)
+
+    assert while_running == {}
+    assert salsify.attempts == ["A_FRONT_01.jpg"]
+    assert state["delta_link"] == "d2"
+
+
+def test_run_daemon_stops_promptly_on_shutdown(monkeypatch, tmp_path):
+    closed = DummyAuth.closed
+    started = time.time()
+
+    _run_daemon(monkeypatch, tmp_path, DummySP({}, {}), DummySalsify(), until=lambda: False, timeout=0.2)
+
+    assert time.time() - started < 5.0
+    assert DummyAuth.closed == closed + 1
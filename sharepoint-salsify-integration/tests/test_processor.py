@@ -1,29 +1,209 @@
 from __future__ import annotations
 
+import contextlib
+import threading
 from pathlib import Path
 
+import pytest
+
 from src.processors.file_processor import FileProcessor
 
 
 class DummySP:
+    def download_slot(self):  # noqa: D401
+        return contextlib.nullcontext()
+
     def download_file_stream(self, drive_id, item_id):  # noqa: D401
         from io import BytesIO
 
-        return BytesIO(b"data")
+        return BytesIO(b"data"), 4
 
 
 class DummySalsify:
-    def upload_asset(self, file_stream, filename, content_type=None):  # noqa: D401
+    def upload_slot(self):  # noqa: D401
+        return contextlib.nullcontext()
+
+    def upload_asset(self, file_stream, filename, content_type=None, size=None):  # noqa: D401
         return {"id": "asset123"}
 
     def update_product_association(self, product_code, asset_id):  # noqa: D401
         return None
 
 
-def test_extract_product_code():
-    fp = FileProcessor(DummySP(), DummySalsify(), Path("/tmp/processed_files.json"))
+def test_extract_product_code(tmp_path):
+    fp = FileProcessor(DummySP(), DummySalsify(), tmp_path / "processed_files.log")
     code, typ, ver = fp.extract_product_code("ABC123_FRONT_01.jpg")
     assert code == "ABC123"
     assert typ == "FRONT"
     assert ver == "01"
+    fp.close()
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("ABC_FRONT_01_v2.jpg", ("ABC", "FRONT", "01")),
+        ("ABC_FRONT_01.final.jpg", ("ABC", "FRONT", "01.final")),
+    ],
+)
+def test_extract_product_code_ignores_trailing_parts(tmp_path, filename, expected):
+    fp = FileProcessor(DummySP(), DummySalsify(), tmp_path / "processed_files.log")
+    assert fp.extract_product_code(filename) == expected
+    fp.close()
+
+
+@pytest.mark.parametrize("filename", ["ABC123_FRONT.jpg", "ABC123.jpg"])
+def test_extract_product_code_rejects_malformed_names(tmp_path, filename):
+    fp = FileProcessor(DummySP(), DummySalsify(), tmp_path / "processed_files.log")
+    with pytest.raises(ValueError):
+        fp.extract_product_code(filename)
+    fp.close()
+
+
+def test_process_file_appends_to_processed_log(tmp_path):
+    log_path = tmp_path / "processed_files.log"
+    fp = FileProcessor(DummySP(), DummySalsify(), log_path)
+    res = fp.process_file("drive", {"id": "1", "name": "ABC123_FRONT_01.jpg"})
+    assert res["status"] == "success"
+    fp.close()
+    assert log_path.read_text(encoding="utf-8") == "ABC123_FRONT_01.jpg\n"
+
+    fp2 = FileProcessor(DummySP(), DummySalsify(), log_path)
+    assert fp2.process_file("drive", {"id": "1", "name": "ABC123_FRONT_01.jpg"})["status"] == "skipped"
+    fp2.close()
+
+
+def test_process_file_skips_processed_name_before_parsing(tmp_path):
+    log_path = tmp_path / "processed_files.log"
+    log_path.write_text("unparseable.jpg\n", encoding="utf-8")
+    fp = FileProcessor(DummySP(), DummySalsify(), log_path)
+    res = fp.process_file("drive", {"id": "1", "name": "unparseable.jpg"})
+    assert res == {"status": "skipped", "reason": "already_processed", "name": "unparseable.jpg"}
+    fp.close()
+
+
+def test_load_processed_migrates_legacy_json(tmp_path):
+    (tmp_path / "processed_files.json").write_text('["OLD_FRONT_01.png"]', encoding="utf-8")
+    fp = FileProcessor(DummySP(), DummySalsify(), tmp_path / "processed_files.log")
+    assert "OLD_FRONT_01.png" in fp.processed
+    fp.close()
+
+
+def test_load_processed_migrates_legacy_json_into_empty_log(tmp_path):
+    (tmp_path / "processed_files.json").write_text('["OLD_FRONT_01.png", "OLD_BACK_01.png"]', encoding="utf-8")
+    log_path = tmp_path / "processed_files.log"
+    log_path.touch()
+    fp = FileProcessor(DummySP(), DummySalsify(), log_path)
+    assert fp.processed == {"OLD_FRONT_01.png", "OLD_BACK_01.png"}
+    fp.close()
+    assert log_path.read_text(encoding="utf-8") == "OLD_BACK_01.png\nOLD_FRONT_01.png\n"
+
+
+def test_process_file_claims_name_across_threads(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    class BlockingSalsify(DummySalsify):
+        def upload_asset(self, file_stream, filename, content_type=None, size=None):  # noqa: D401
+            started.set()
+            release.wait(timeout=5)
+            return {"id": "asset123"}
+
+    fp = FileProcessor(DummySP(), BlockingSalsify(), tmp_path / "processed_files.log")
+    item = {"id": "1", "name": "ABC123_FRONT_01.jpg"}
+    results = []
+    t = threading.Thread(target=lambda: results.append(fp.process_file("drive", item)))
+    t.start()
+    assert started.wait(timeout=5)
+    assert fp.process_file("drive", item)["reason"] == "in_progress"
+    release.set()
+    t.join(timeout=5)
+    assert results[0]["status"] == "success"
+    fp.close()
+
+
+def test_process_file_failure_releases_claim(tmp_path):
+    class FailingSalsify(DummySalsify):
+        def upload_asset(self, file_stream, filename, content_type=None, size=None):  # noqa: D401
+            raise RuntimeError("boom")
+
+    fp = FileProcessor(DummySP(), FailingSalsify(), tmp_path / "processed_files.log")
+    with pytest.raises(RuntimeError):
+        fp.process_file("drive", {"id": "1", "name": "ABC123_FRONT_01.jpg"})
+    assert "ABC123_FRONT_01.jpg" not in fp.processed
+    assert not fp._claims
+    fp.close()
+
+
+def test_process_file_falls_back_to_listed_size_without_content_length(tmp_path):
+    sizes = []
+
+    class UnsizedSP(DummySP):
+        def download_file_stream(self, drive_id, item_id):  # noqa: D401
+            from io import BytesIO
+
+            return BytesIO(b"data"), None
+
+    class RecordingSalsify(DummySalsify):
+        def upload_asset(self, file_stream, filename, content_type=None, size=None):  # noqa: D401
+            sizes.append(size)
+            return {"id": "asset123"}
+
+    fp = FileProcessor(UnsizedSP(), RecordingSalsify(), tmp_path / "processed_files.log")
+    assert fp.process_file("drive", {"id": "1", "name": "ABC123_FRONT_01.jpg", "size": 4})["status"] == "success"
+    assert sizes == [4]
+    fp.close()
+
+
+def test_validate_file_extensions(tmp_path):
+    fp = FileProcessor(DummySP(), DummySalsify(), tmp_path / "processed_files.log")
+    assert fp.validate_file({"name": "ABC123_FRONT_01.TIFF"})
+    assert not fp.validate_file({"name": "ABC123_FRONT_01.gif"})
+    assert not fp.validate_file({})
+    fp.close()
+
+
+def test_process_file_takes_upload_slot_before_download_and_holds_download_slot(tmp_path):
+    events = []
+
+    @contextlib.contextmanager
+    def slot(label):
+        events.append(f"{label} acquired")
+        yield
+        events.append(f"{label} released")
+
+    class Stream:
+        def read(self, size=-1):  # noqa: D401
+            return b""
+
+        def close(self):  # noqa: D401
+            events.append("stream closed")
+
+    class RecordingSP(DummySP):
+        def download_slot(self):  # noqa: D401
+            return slot("download")
+
+        def download_file_stream(self, drive_id, item_id):  # noqa: D401
+            events.append("download opened")
+            return Stream(), 0
+
+    class RecordingSalsify(DummySalsify):
+        def upload_slot(self):  # noqa: D401
+            return slot("upload")
+
+        def upload_asset(self, file_stream, filename, content_type=None, size=None):  # noqa: D401
+            events.append("uploaded")
+            return {"id": "asset123"}
 
+    fp = FileProcessor(RecordingSP(), RecordingSalsify(), tmp_path / "processed_files.log")
+    assert fp.process_file("drive", {"id": "1", "name": "ABC123_FRONT_01.jpg"})["status"] == "success"
+    fp.close()
+    assert events == [
+        "upload acquired",
+        "download acquired",
+        "download opened",
+        "uploaded",
+        "stream closed",
+        "download released",
+        "upload released",
+    ]